@@ -1,10 +1,28 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from .models import Service, UserWorkflow, BudgetService, Transaction
 
 
+class ListOnlyChangeList(ChangeList):
+    """ChangeList that loads only the model admin's ``list_only`` columns."""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.only(*self.model_admin.list_only)
+
+
+class ListOnlyMixin:
+    """Skip wide columns on the changelist; change forms still load full rows."""
+    list_only = ()
+
+    def get_changelist(self, request, **kwargs):
+        return ListOnlyChangeList
+
+
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(ListOnlyMixin, admin.ModelAdmin):
     list_display = ['name', 'slug', 'is_active', 'created_at']
+    list_only = ['id', 'name', 'slug', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'slug', 'description']
     readonly_fields = ['created_at', 'updated_at']
@@ -23,10 +41,13 @@ class ServiceAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserWorkflow)
-class UserWorkflowAdmin(admin.ModelAdmin):
+class UserWorkflowAdmin(ListOnlyMixin, admin.ModelAdmin):
     list_display = ['user', 'service', 'name', 'active', 'created_at']
+    list_select_related = ['user', 'service']
+    list_only = ['id', 'name', 'active', 'created_at', 'user__username', 'service__name']
     list_filter = ['active', 'service', 'created_at']
     search_fields = ['user__username', 'service__name', 'name']
+    autocomplete_fields = ['user', 'service']
     readonly_fields = ['created_at', 'updated_at', 'n8n_workflow_id', 'n8n_credential_id']
     fieldsets = (
         ('User & Service', {
@@ -45,18 +66,42 @@ class UserWorkflowAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'service')
+
 
 @admin.register(BudgetService)
 class BudgetServiceAdmin(admin.ModelAdmin):
-    list_display = ['user', 'phone_number', 'budget_amount', 'updated_at']
+    list_display = ['user', 'phone_number', 'budget_amount', 'spent', 'updated_at']
+    list_select_related = ['user']
     list_filter = ['updated_at']
     search_fields = ['user__username', 'phone_number']
-    readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['user']
+    readonly_fields = ['spent', 'created_at', 'updated_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change or 'phone_number' in form.changed_data:
+            BudgetService.recalculate_spent([obj.phone_number])
+        # Budget edits change api_budget_remaining even when spent does not
+        BudgetService.invalidate_cache([obj.phone_number, form.initial.get('phone_number')])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        BudgetService.invalidate_cache([obj.phone_number])
+
+    def delete_queryset(self, request, queryset):
+        phones = set(queryset.values_list('phone_number', flat=True))
+        super().delete_queryset(request, queryset)
+        BudgetService.invalidate_cache(phones)
 
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['phone_number', 'name', 'date', 'total', 'created_at']
+    # No date_hierarchy: it runs an unfiltered DISTINCT date_trunc over the whole table.
     list_filter = ['date', 'created_at']
     search_fields = ['phone_number', 'name']
-    date_hierarchy = 'date'
@@ -0,0 +1,12 @@
+"""Cache keys shared by the views that fill them and the code that invalidates them."""
+
+LANDING_CACHE_KEY = 'landing:anon'
+ACTIVE_SERVICES_CACHE_KEY = 'services:active'
+
+
+def budget_cache_key(phone):
+    return f"budget:{phone}"
+
+
+def username_cache_key(phone):
+    return f"phonelookup:{phone}"
@@ -1,16 +1,66 @@
 from __future__ import annotations
 
+import json
+import threading
+import time
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.utils import timezone
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
 from .models import GoogleCredential
 
 GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
 
+# Per-process cache of built Credentials keyed by user id. Entries expire after
+# a short TTL so other workers pick up sign-outs; local writes invalidate via signals.
+CREDENTIALS_CACHE_TTL = 300
+CREDENTIALS_CACHE_MAXSIZE = 1024
+_creds_cache: dict[int, tuple[float, Credentials]] = {}
+_creds_lock = threading.Lock()
+
+# Stored access tokens expiring within this many seconds are refreshed up front.
+TOKEN_EXPIRY_MARGIN = 60
+
+
+@lru_cache(maxsize=1)
+def _auth_request() -> Request:
+    """Shared token-refresh transport so refreshes reuse pooled keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+    session.mount("https://", adapter)
+    return Request(session=session)
+
+
+def invalidate_user_credentials(user_id) -> None:
+    """Drop any cached Credentials for the given user id."""
+    with _creds_lock:
+        _creds_cache.pop(user_id, None)
+
+
+def _cache_credentials(user_id, credentials: Credentials) -> None:
+    with _creds_lock:
+        if user_id not in _creds_cache and len(_creds_cache) >= CREDENTIALS_CACHE_MAXSIZE:
+            _creds_cache.pop(next(iter(_creds_cache)))
+        _creds_cache[user_id] = (time.monotonic() + CREDENTIALS_CACHE_TTL, credentials)
+
 
 def get_user_credentials(user) -> Credentials:
     """Return valid google Credentials for the given user, refreshing if needed."""
+    with _creds_lock:
+        entry = _creds_cache.get(user.id)
+    if entry is not None:
+        expires_at, credentials = entry
+        if expires_at > time.monotonic() and credentials.valid:
+            return credentials
+        invalidate_user_credentials(user.id)
+
     cred = GoogleCredential.objects.get(user=user)
     credentials = Credentials(
         token=cred.access_token,
@@ -19,20 +69,42 @@ def get_user_credentials(user) -> Credentials:
         client_id=settings.GOOGLE_CLIENT_ID,
         client_secret=settings.GOOGLE_CLIENT_SECRET,
         scopes=cred.scopes.split() if cred.scopes else [],
+        # google-auth compares expiry against naive UTC
+        expiry=timezone.make_naive(cred.token_expiry, dt_timezone.utc) if cred.token_expiry else None,
     )
-    if not credentials.valid or credentials.expired:
-        credentials.refresh(Request())
+    # One timestamp comparison instead of google-auth's valid/expired properties
+    needs_refresh = not cred.access_token or (
+        cred.token_expiry is not None
+        and cred.token_expiry.timestamp() - time.time() < TOKEN_EXPIRY_MARGIN
+    )
+    if needs_refresh:
+        credentials.refresh(_auth_request())
         cred.access_token = credentials.token
         cred.token_expiry = credentials.expiry
         cred.save(update_fields=["access_token", "token_expiry"])
+    _cache_credentials(user.id, credentials)
     return credentials
 
 
+@lru_cache(maxsize=None)
+def _discovery_document(service_name: str, version: str) -> dict | None:
+    """Parse the bundled discovery document once per process."""
+    doc = discovery_cache.get_static_doc(service_name, version)
+    return json.loads(doc) if doc else None
+
+
+def _build_service(service_name: str, version: str, credentials: Credentials):
+    doc = _discovery_document(service_name, version)
+    if doc is None:
+        return build(service_name, version, credentials=credentials, cache_discovery=False)
+    return build_from_document(doc, credentials=credentials)
+
+
 def get_gmail_service(user):
     creds = get_user_credentials(user)
-    return build("gmail", "v1", credentials=creds, cache_discovery=False)
+    return _build_service("gmail", "v1", creds)
 
 
 def get_calendar_service(user):
     creds = get_user_credentials(user)
-    return build("calendar", "v3", credentials=creds, cache_discovery=False)
+    return _build_service("calendar", "v3", creds)
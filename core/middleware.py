@@ -0,0 +1,23 @@
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserWorkflow
+
+
+class UnlockedServicesMiddleware:
+    """Attach ``request.unlocked_service_ids``, the ids of the user's unlocked services.
+
+    The set is loaded lazily, so only views that read it run the query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.unlocked_service_ids = SimpleLazyObject(lambda: self._unlocked_service_ids(request.user))
+        return self.get_response(request)
+
+    @staticmethod
+    def _unlocked_service_ids(user):
+        if not user.is_authenticated:
+            return frozenset()
+        return frozenset(UserWorkflow.objects.filter(user=user).values_list('service_id', flat=True))
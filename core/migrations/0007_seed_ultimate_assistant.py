@@ -24,7 +24,13 @@ def seed_services(apps, schema_editor):
         ],
         'is_active': True,
     }
-    Service.objects.update_or_create(slug='ultimate-personal-assistant', defaults=defaults)
+    # Single INSERT ... ON CONFLICT (slug) DO UPDATE instead of SELECT + INSERT/UPDATE
+    Service.objects.bulk_create(
+        [Service(slug='ultimate-personal-assistant', **defaults)],
+        update_conflicts=True,
+        unique_fields=['slug'],
+        update_fields=list(defaults) + ['updated_at'],
+    )
 
 
 def unseed_services(apps, schema_editor):
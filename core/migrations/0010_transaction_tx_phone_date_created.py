@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_remove_n8n_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['phone_number', '-date', '-created_at'], name='tx_phone_date_created'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-16 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_transaction_tx_phone_date_created'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userworkflow',
+            index=models.Index(fields=['user', 'active'], name='uw_user_active'),
+        ),
+        migrations.AddIndex(
+            model_name='userworkflow',
+            index=models.Index(fields=['service', 'active'], name='uw_service_active'),
+        ),
+    ]
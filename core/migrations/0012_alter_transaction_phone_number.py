@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_userworkflow_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='phone_number',
+            field=models.CharField(max_length=20),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-16 13:05
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_spent(apps, schema_editor):
+    BudgetService = apps.get_model('core', 'BudgetService')
+    Transaction = apps.get_model('core', 'Transaction')
+    totals = (
+        Transaction.objects.filter(phone_number=OuterRef('phone_number'))
+        .order_by()
+        .values('phone_number')
+        .annotate(s=Sum('total'))
+        .values('s')
+    )
+    BudgetService.objects.update(spent=Coalesce(
+        Subquery(totals), Value(0),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_alter_transaction_phone_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetservice',
+            name='spent',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Running sum of transactions for this phone number', max_digits=12),
+        ),
+        migrations.RunPython(backfill_spent, migrations.RunPython.noop),
+    ]
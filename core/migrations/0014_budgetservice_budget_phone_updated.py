@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-16 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_budgetservice_spent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budgetservice',
+            index=models.Index(fields=['phone_number', '-updated_at'], name='budget_phone_updated'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-16 15:10
+
+from django.db import migrations
+
+INDEX_NAME = 'auth_user_username_upper_idx'
+
+
+def create_index(apps, schema_editor):
+    # username__iexact compiles to UPPER("username"::text) on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON auth_user (UPPER(username::text))'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0014_budgetservice_budget_phone_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .cache_keys import budget_cache_key
+
 
 class UserProfile(models.Model):
     """Profile data for a Django auth user (e.g., phone number)."""
@@ -13,6 +18,14 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"Profile for {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a phone change can invalidate the old number's cached lookup;
+        # read __dict__ so deferred loads don't trigger a query
+        instance._loaded_phone_number = instance.__dict__.get('phone_number')
+        return instance
+
 
 class Service(models.Model):
     """Represents a service that users can unlock (e.g., Budget Tracker, CRM, etc.)"""
@@ -36,6 +49,15 @@ class Service(models.Model):
         ordering = ['name']
 
 
+class UserWorkflowQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """A user's workflows with their service joined in, for list pages."""
+        return self.filter(user=user).select_related('service').only(
+            'id', 'active', 'service',
+            'service__slug', 'service__name', 'service__description', 'service__icon',
+        )
+
+
 class UserWorkflow(models.Model):
     """Links users to their provisioned n8n workflows and credentials"""
 
@@ -53,11 +75,17 @@ class UserWorkflow(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserWorkflowQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username} - {self.service.name}"
 
     class Meta:
         unique_together = ['user', 'service']
+        indexes = [
+            models.Index(fields=['user', 'active'], name='uw_user_active'),
+            models.Index(fields=['service', 'active'], name='uw_service_active'),
+        ]
         ordering = ['-created_at']
 
 
@@ -92,31 +120,136 @@ class BudgetService(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_profiles')
     phone_number = models.CharField(max_length=20, help_text="Normalized phone number used as identifier")
     budget_amount = models.DecimalField(max_digits=12, decimal_places=2, help_text="Monthly budget amount")
+    spent = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Running sum of transactions for this phone number")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['user', 'phone_number']
         ordering = ['-updated_at']
+        # The unique (user, phone_number) index cannot serve phone-only lookups
+        indexes = [
+            models.Index(fields=['phone_number', '-updated_at'], name='budget_phone_updated'),
+        ]
 
     def __str__(self):
         return f"Budget for {self.user.username} ({self.phone_number})"
 
+    @classmethod
+    def upsert(cls, *, user, phone_number, budget_amount):
+        """Set the budget for (user, phone_number), creating the row if needed.
+
+        Runs as UPDATE, then INSERT only when no row matched (retrying the
+        UPDATE if a concurrent insert wins), rather than INSERT ... ON CONFLICT:
+        that keeps the transaction aggregate for ``spent`` off the common
+        update path. ``spent`` is seeded only for new rows; existing rows are
+        already kept in step by Transaction.
+        """
+        fields = {'budget_amount': budget_amount, 'updated_at': timezone.now()}
+        # Atomic so the cache invalidation below waits for the new amount to commit
+        with transaction.atomic():
+            if not cls.objects.filter(user=user, phone_number=phone_number).update(**fields):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(user=user, phone_number=phone_number, budget_amount=budget_amount)
+                except IntegrityError:
+                    # A concurrent request inserted the row first; its spend is already seeded
+                    cls.objects.filter(user=user, phone_number=phone_number).update(**fields)
+                else:
+                    # Seed spent after the row exists, so a transaction saved meanwhile is counted
+                    cls.recalculate_spent([phone_number])
+            cls.invalidate_cache([phone_number])
+
+    @staticmethod
+    def invalidate_cache(phone_numbers):
+        """Drop the cached api_budget_remaining payloads once the current transaction commits."""
+        keys = [budget_cache_key(phone) for phone in phone_numbers if phone]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @classmethod
+    def adjust_spent(cls, phone_number, delta):
+        """Apply a transaction delta to ``spent`` for every budget on this phone number."""
+        cls.invalidate_cache([phone_number])
+        return cls.objects.filter(phone_number=phone_number).update(spent=F('spent') + delta)
+
+    @classmethod
+    def recalculate_spent(cls, phone_numbers):
+        """Recompute ``spent`` from the Transaction table for the given phone numbers."""
+        totals = (
+            Transaction.objects.filter(phone_number=OuterRef('phone_number'))
+            .order_by()
+            .values('phone_number')
+            .annotate(s=Sum('total'))
+            .values('s')
+        )
+        cls.invalidate_cache(phone_numbers)
+        return cls.objects.filter(phone_number__in=phone_numbers).update(spent=Coalesce(
+            Subquery(totals), Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+
+
+class TransactionQuerySet(models.QuerySet):
+    def delete(self):
+        """Delete the rows, then resync BudgetService.spent for the phone numbers they touched."""
+        with transaction.atomic():
+            phones = set(self.order_by().values_list('phone_number', flat=True).distinct())
+            result = super().delete()
+            BudgetService.recalculate_spent(phones)
+        return result
+
 
 class Transaction(models.Model):
     """Stores transactions tied to a phone number for the Budget Tracker service."""
 
-    phone_number = models.CharField(max_length=20, db_index=True)
+    # Lookups by phone are served by the composite indexes in Meta, which lead with phone_number
+    phone_number = models.CharField(max_length=20)
     name = models.CharField(max_length=255)
     date = models.DateField()
     total = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TransactionQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['phone_number', 'date']),
+            models.Index(fields=['phone_number', '-date', '-created_at'], name='tx_phone_date_created'),
         ]
         ordering = ['-date', '-created_at']
 
     def __str__(self):
         return f"{self.name} ({self.phone_number}) - {self.total}"
+
+    # BudgetService.spent is maintained here so every save and delete keeps it in step.
+    # bulk_create and QuerySet.update bypass these and must call recalculate_spent.
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'phone_number', 'total'} & set(update_fields):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self._state.adding:
+                super().save(*args, **kwargs)
+                BudgetService.adjust_spent(self.phone_number, self.total)
+            else:
+                # Edits can change the total or move the row to another phone
+                old_phone = Transaction.objects.filter(pk=self.pk).values_list('phone_number', flat=True).first()
+                super().save(*args, **kwargs)
+                BudgetService.recalculate_spent({self.phone_number, old_phone} - {None})
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            BudgetService.adjust_spent(self.phone_number, -self.total)
+        return result
+
+    @classmethod
+    def bulk_ingest(cls, records, batch_size=500):
+        """Insert many transactions from dicts of field values in batched INSERTs."""
+        objs = [cls(**record) for record in records]
+        with transaction.atomic():
+            created = cls.objects.bulk_create(objs, batch_size=batch_size)
+            # bulk_create skips save(), so resync spend (and its cache) for the touched phones
+            BudgetService.recalculate_spent({obj.phone_number for obj in objs})
+        return created
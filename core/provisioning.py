@@ -1,4 +1,5 @@
 from typing import Optional
+from django.db import transaction
 from .models import Service, UserWorkflow
 
 
@@ -13,13 +14,14 @@ def unlock_service_for_user(*, user, service: Service) -> bool:
     Returns:
         True if successful, False if service is already unlocked
     """
-    # Check if user already has this service
-    if UserWorkflow.objects.filter(user=user, service=service).exists():
+    # One query answers: already unlocked? any active service? first service?
+    statuses = list(UserWorkflow.objects.filter(user=user).values_list('active', 'service_id'))
+    if any(service_id == service.id for _, service_id in statuses):
         return False
 
     # Check if user has any active services - if not, make this one active
-    has_active_service = UserWorkflow.objects.filter(user=user, active=True).exists()
-    is_first_service = not UserWorkflow.objects.filter(user=user).exists()
+    has_active_service = any(active for active, _ in statuses)
+    is_first_service = not statuses
 
     # Special handling for Ultimate Personal Assistant - requires Google credentials to activate
     should_activate = True
@@ -54,29 +56,26 @@ def toggle_user_service(*, user, service: Service) -> bool:
     Returns:
         True if successful, False if the user doesn't have this service
     """
-    try:
-        # Get the user's workflow for this service
-        user_workflow = UserWorkflow.objects.get(user=user, service=service)
-    except UserWorkflow.DoesNotExist:
+    # Get the user's workflow for this service
+    user_workflow = UserWorkflow.objects.filter(user=user, service=service).only('id', 'active').first()
+    if user_workflow is None:
         return False
 
-    # Deactivate all user's workflows in database
-    UserWorkflow.objects.filter(user=user, active=True).update(active=False)
-
-    # Activate the selected workflow
-    user_workflow.active = True
-    user_workflow.save(update_fields=["active"])
+    # Deactivate the user's other workflows and activate this one: two UPDATEs, one commit
+    with transaction.atomic():
+        deactivated = UserWorkflow.objects.filter(user=user, active=True).exclude(pk=user_workflow.pk).update(active=False)
+        if user_workflow.active and not deactivated:
+            # Already the only active workflow; nothing left to write
+            return True
+        UserWorkflow.objects.filter(pk=user_workflow.pk).update(active=True)
 
     return True
 
 
 def get_active_service(user) -> Optional[Service]:
     """Get the currently active service for a user"""
-    try:
-        user_workflow = UserWorkflow.objects.get(user=user, active=True)
-        return user_workflow.service
-    except UserWorkflow.DoesNotExist:
-        return None
+    user_workflow = UserWorkflow.objects.select_related('service').filter(user=user, active=True).first()
+    return user_workflow.service if user_workflow else None
 
 
 def cleanup_user_workflows(user) -> None:
@@ -1,8 +1,10 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import UserProfile
+from .cache_keys import ACTIVE_SERVICES_CACHE_KEY, LANDING_CACHE_KEY, username_cache_key
+from .models import BudgetService, GoogleCredential, Service, Transaction, UserProfile
 
 
 @receiver(post_save, sender=User)
@@ -19,3 +21,32 @@ def save_user_profile(sender, instance, **kwargs):
         UserProfile.objects.create(user=instance)
 
 
+@receiver(post_save, sender=GoogleCredential)
+@receiver(post_delete, sender=GoogleCredential)
+def invalidate_google_credentials(sender, instance, **kwargs):
+    from .google_api import invalidate_user_credentials
+
+    invalidate_user_credentials(instance.user_id)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service_caches(sender, instance, **kwargs):
+    cache.delete_many([LANDING_CACHE_KEY, ACTIVE_SERVICES_CACHE_KEY])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_phone_lookup(sender, instance, **kwargs):
+    # Drop both the current and the previously loaded phone's cached username
+    phones = {instance.phone_number, getattr(instance, '_loaded_phone_number', None)} - {None, ''}
+    if phones:
+        cache.delete_many([username_cache_key(phone) for phone in phones])
+    instance._loaded_phone_number = instance.phone_number
+
+
+@receiver(post_save, sender=Transaction)
+def sync_spent_for_raw_transaction(sender, instance, raw, **kwargs):
+    # Fixture loads save raw and skip Transaction.save(), which maintains spent
+    if raw:
+        BudgetService.recalculate_spent([instance.phone_number])
@@ -1,9 +1,24 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import GoogleCredential
+from . import google_api, views
+from .models import BudgetService, GoogleCredential, Service, Transaction, UserProfile, UserWorkflow
+from .provisioning import toggle_user_service
+from .views import _normalize_phone, _parse_amount
+
 
+# Tests get a private in-process cache; cache.clear() must never reach the shared one
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
 
+
+@override_settings(CACHES=TEST_CACHES)
 class GoogleCredentialModelTest(TestCase):
     def test_str_contains_username(self):
         user = User.objects.create_user(username='alice')
@@ -11,8 +26,302 @@ class GoogleCredentialModelTest(TestCase):
         self.assertIn('alice', str(cred))
 
 
+@override_settings(CACHES=TEST_CACHES)
+class GoogleCredentialCacheTest(TestCase):
+    def setUp(self):
+        google_api._creds_cache.clear()
+
+    def test_credentials_reused_until_deleted(self):
+        user = User.objects.create_user(username='bob')
+        cred = GoogleCredential.objects.create(user=user, refresh_token='r', access_token='a')
+        first = google_api.get_user_credentials(user)
+        self.assertIs(google_api.get_user_credentials(user), first)
+        cred.delete()
+        with self.assertRaises(GoogleCredential.DoesNotExist):
+            google_api.get_user_credentials(user)
+
+
+@override_settings(CACHES=TEST_CACHES)
 class GmailApiAuthTest(TestCase):
     def test_send_requires_api_key(self):
         url = reverse('core:api_google_gmail_send')
         resp = self.client.post(url, content_type='application/json', data={})
         self.assertEqual(resp.status_code, 401)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ToggleUserServiceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='carol')
+        self.first = Service.objects.create(slug='svc-a', name='A', description='a')
+        self.second = Service.objects.create(slug='svc-b', name='B', description='b')
+        UserWorkflow.objects.create(user=self.user, service=self.first, name='a', active=True)
+        UserWorkflow.objects.create(user=self.user, service=self.second, name='b', active=False)
+
+    def test_switches_active_workflow(self):
+        self.assertTrue(toggle_user_service(user=self.user, service=self.second))
+        active = UserWorkflow.objects.filter(user=self.user, active=True)
+        self.assertEqual([uw.service_id for uw in active], [self.second.id])
+
+    def test_already_active_is_noop(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(toggle_user_service(user=self.user, service=self.first))
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertTrue(UserWorkflow.objects.get(service=self.first).active)
+
+
+@override_settings(INTERNAL_API_KEY='test-key', CACHES=TEST_CACHES)
+class BudgetRemainingApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='dave')
+        BudgetService.objects.create(user=user, phone_number='15551234', budget_amount=Decimal('100'))
+
+    def remaining(self):
+        url = reverse('core:api_budget_remaining')
+        return self.client.get(url, {'phone': '15551234'}, HTTP_X_API_KEY='test-key').json()['remaining']
+
+    def test_add_transaction_invalidates_cached_remaining(self):
+        self.assertEqual(self.remaining(), '100.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('core:api_add_transaction'),
+                data={'phone': '15551234', 'name': 'Lunch', 'date': '2026-01-01', 'total': '40'},
+                content_type='application/json',
+                HTTP_X_API_KEY='test-key',
+            )
+        self.assertEqual(self.remaining(), '60.00')
+
+    def test_add_transaction_accepts_a_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('core:api_add_transaction'),
+                data={'transactions': [
+                    {'phone': '15551234', 'name': 'Bus', 'date': '2026-01-01', 'total': '5'},
+                    {'phone': '+1 555 1234', 'name': 'Taxi', 'date': '2026-01-02', 'total': 10},
+                ]},
+                content_type='application/json',
+                HTTP_X_API_KEY='test-key',
+            )
+        self.assertEqual(response.json(), {'status': 'ok', 'created': 2})
+        self.assertEqual(self.remaining(), '85.00')
+
+    def test_spent_follows_transaction_saves_and_deletes(self):
+        def spent():
+            return BudgetService.objects.get(phone_number='15551234').spent
+
+        tx = Transaction.objects.create(phone_number='15551234', name='Coffee', date='2026-01-02', total=Decimal('5'))
+        self.assertEqual(spent(), Decimal('5'))
+        tx.total = Decimal('7')
+        tx.save()
+        self.assertEqual(spent(), Decimal('7'))
+        Transaction.objects.filter(pk=tx.pk).delete()
+        self.assertEqual(spent(), Decimal('0'))
+
+    def test_upsert_refreshes_cached_remaining(self):
+        self.assertEqual(self.remaining(), '100.00')
+        user = User.objects.get(username='dave')
+        with self.captureOnCommitCallbacks(execute=True):
+            BudgetService.upsert(user=user, phone_number='15551234', budget_amount=Decimal('150'))
+        self.assertEqual(self.remaining(), '150.00')
+
+    def test_rejects_phone_longer_than_the_column(self):
+        response = self.client.post(
+            reverse('core:api_add_transaction'),
+            data={'phone': '1' * 21, 'name': 'Lunch', 'date': '2026-01-01', 'total': '40'},
+            content_type='application/json',
+            HTTP_X_API_KEY='test-key',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+        url = reverse('core:api_budget_remaining')
+        self.assertEqual(self.client.get(url, {'phone': '1' * 21}, HTTP_X_API_KEY='test-key').status_code, 400)
+        # Formatting characters don't count against the column width
+        self.assertEqual(self.client.get(url, {'phone': '+1 (555) 1234'}, HTTP_X_API_KEY='test-key').status_code, 200)
+
+    def test_rejects_wrong_api_key(self):
+        url = reverse('core:api_budget_remaining')
+        response = self.client.get(url, {'phone': '15551234'}, HTTP_X_API_KEY='wrong-key')
+        self.assertEqual(response.status_code, 401)
+
+    def test_upsert_seeds_spent_from_existing_transactions(self):
+        user = User.objects.create_user(username='erin')
+        Transaction.objects.create(phone_number='15559999', name='Rent', date='2026-01-01', total=Decimal('30'))
+        BudgetService.upsert(user=user, phone_number='15559999', budget_amount=Decimal('50'))
+        BudgetService.upsert(user=user, phone_number='15559999', budget_amount=Decimal('80'))
+        profile = BudgetService.objects.get(user=user)
+        self.assertEqual(profile.spent, Decimal('30'))
+        self.assertEqual(profile.budget_amount, Decimal('80'))
+
+
+@override_settings(INTERNAL_API_KEY='test-key', CACHES=TEST_CACHES)
+class UsernameLookupApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='kate')
+        self.user.profile.phone_number = '15557777'
+        self.user.profile.save()
+
+    def lookup(self, phone):
+        return self.client.get(reverse('core:api_get_username'), {'phone': phone}, HTTP_X_API_KEY='test-key')
+
+    def test_phone_change_invalidates_cached_username(self):
+        self.assertEqual(self.lookup('15557777').json(), {'username': 'kate'})
+        profile = UserProfile.objects.get(user=self.user)
+        profile.phone_number = '15558888'
+        profile.save()
+        self.assertEqual(self.lookup('15557777').status_code, 404)
+        self.assertEqual(self.lookup('15558888').json(), {'username': 'kate'})
+
+
+@override_settings(INTERNAL_API_KEY='test-key', CACHES=TEST_CACHES)
+class ResetPasswordRateLimitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='liam')
+
+    def reset(self, username='liam', **extra):
+        return self.client.post(
+            reverse('core:api_reset_password'),
+            {'username': username, 'password': 'Long-enough-pw1'},
+            HTTP_X_API_KEY='test-key',
+            **extra,
+        )
+
+    def test_reset_stores_the_new_password(self):
+        self.assertEqual(self.reset().status_code, 200)
+        self.assertTrue(User.objects.get(username='liam').check_password('Long-enough-pw1'))
+
+    def test_username_limit_returns_429(self):
+        statuses = [self.reset().status_code for _ in range(views.RESET_PASSWORD_USER_LIMIT + 1)]
+        self.assertEqual(statuses, [200] * views.RESET_PASSWORD_USER_LIMIT + [429])
+
+    def test_username_match_ignores_case_unless_ambiguous(self):
+        self.assertEqual(self.reset('LIAM').status_code, 200)
+        User.objects.create_user(username='Liam')
+        self.assertEqual(self.reset('LIAM').status_code, 404)
+        self.assertEqual(self.reset('Liam').status_code, 200)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_ip_limit_uses_the_forwarded_client_address(self):
+        for i in range(views.RESET_PASSWORD_IP_LIMIT):
+            self.reset(f'user{i}', HTTP_X_FORWARDED_FOR='203.0.113.5')
+        self.assertEqual(self.reset('other', HTTP_X_FORWARDED_FOR='203.0.113.5').status_code, 429)
+        # A different client behind the same proxy keeps its own budget
+        self.assertEqual(self.reset('other', HTTP_X_FORWARDED_FOR='198.51.100.7').status_code, 404)
+
+    def test_ip_limit_applies_across_usernames(self):
+        statuses = [self.reset(f'user{i}').status_code for i in range(views.RESET_PASSWORD_IP_LIMIT + 1)]
+        self.assertEqual(statuses[:-1], [404] * views.RESET_PASSWORD_IP_LIMIT)
+        self.assertEqual(statuses[-1], 429)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ServiceOverviewPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='frank', password='pw')
+        UserProfile.objects.filter(user=self.user).update(phone_number='15550000')
+        self.service = Service.objects.get(slug='budget-tracker')
+        UserWorkflow.objects.create(user=self.user, service=self.service, name='budget', active=True)
+        for day in range(1, 4):
+            Transaction.objects.create(phone_number='15550000', name=f'tx{day}', date=f'2026-01-0{day}', total=Decimal('1'))
+        self.client.login(username='frank', password='pw')
+
+    def test_update_budget_answers_ajax_with_json(self):
+        url = reverse('core:update_budget', args=[self.service.slug])
+        response = self.client.post(url, {'budget_amount': '10'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'success': True, 'budget': '10', 'remaining': '7.00'})
+
+    def test_export_streams_all_transactions(self):
+        response = self.client.get(reverse('core:export_transactions', args=[self.service.slug]))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'date,name,total')
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['tx3', 'tx2', 'tx1'])
+
+    def test_export_neutralizes_formula_names(self):
+        Transaction.objects.create(phone_number='15550000', name='=HYPERLINK("x")', date='2026-01-04', total=Decimal('1'))
+        response = self.client.get(reverse('core:export_transactions', args=[self.service.slug]))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[1], '2026-01-04,"\'=HYPERLINK(""x"")",1.00')
+
+    @mock.patch.object(views, 'TRANSACTIONS_PAGE_SIZE', 2)
+    def test_pages_follow_cursor(self):
+        url = reverse('core:service_overview', args=[self.service.slug])
+        first = self.client.get(url)
+        self.assertEqual([t.name for t in first.context['transactions']], ['tx3', 'tx2'])
+        second = self.client.get(url, {'after': first.context['next_cursor']})
+        self.assertEqual([t.name for t in second.context['transactions']], ['tx1'])
+        self.assertIsNone(second.context['next_cursor'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SignupPhoneUniquenessTest(TestCase):
+    def signup(self, username, phone):
+        return self.client.post(reverse('core:signup'), {
+            'username': username,
+            'password1': 'a-Strong-pass-123',
+            'password2': 'a-Strong-pass-123',
+            'phone_number': phone,
+        })
+
+    def test_duplicate_phone_is_rejected_without_creating_user(self):
+        self.signup('gina', '+1 555 0101')
+        self.client.logout()
+        response = self.signup('hank', '15550101')
+        self.assertIn('phone_number', response.context['form'].errors)
+        self.assertFalse(User.objects.filter(username='hank').exists())
+
+    def test_blank_phones_do_not_collide(self):
+        self.signup('ivy', '')
+        self.client.logout()
+        self.signup('jack', '')
+        self.assertEqual(UserProfile.objects.filter(phone_number__isnull=True).count(), 2)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LandingPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_service_change_refreshes_cached_page(self):
+        self.client.get(reverse('core:landing_page'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('core:landing_page'))
+        Service.objects.create(slug='svc-new', name='Brand New Service', description='new')
+        self.assertContains(self.client.get(reverse('core:landing_page')), 'Brand New Service')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ActiveServiceCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_deactivating_a_service_drops_it_from_the_cache(self):
+        service = views._get_active_service_or_404('budget-tracker')
+        with self.assertNumQueries(0):
+            views._get_active_service_or_404('budget-tracker')
+        service.is_active = False
+        service.save()
+        with self.assertRaises(Http404):
+            views._get_active_service_or_404('budget-tracker')
+
+
+class NormalizePhoneTest(SimpleTestCase):
+    def test_strips_formatting_and_leading_plus(self):
+        self.assertEqual(_normalize_phone('+1 (555) 123-4567'), '15551234567')
+        self.assertEqual(_normalize_phone('555\u00a0123'), '555123')
+        self.assertEqual(_normalize_phone('\u2013555'), '555')
+        self.assertEqual(_normalize_phone('++44 20'), '4420')
+
+
+class ParseAmountTest(SimpleTestCase):
+    def test_accepts_numbers_and_numeric_strings(self):
+        self.assertEqual(_parse_amount('12.50'), Decimal('12.50'))
+        self.assertEqual(_parse_amount(3), Decimal('3'))
+        self.assertEqual(_parse_amount(0.1), Decimal('0.1'))
+
+    def test_rejects_non_finite_and_garbage(self):
+        for value in ('NaN', 'Infinity', 'abc', None, True):
+            self.assertIsNone(_parse_amount(value))
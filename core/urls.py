@@ -3,32 +3,16 @@ from . import views
 
 app_name = 'core'
 
+# Ordered roughly by traffic: URLResolver tries patterns in order, so the
+# per-message n8n APIs and main pages come first. Keep 'service/<slug>/'
+# ahead of 'service/toggle/' to preserve existing resolution.
 urlpatterns = [
-    path('', views.landing_page, name='landing_page'),
-    path('privacy/', views.privacy_policy, name='privacy_policy'),
-    path('signup/', views.signup_view, name='signup'),
-    path('login/', views.login_view, name='login'),
-    path('logout/', views.logout_view, name='logout'),
-    path('dashboard/', views.dashboard, name='dashboard'),
-    path('service/<slug:service_slug>/', views.service_detail, name='service_detail'),
-    path('service/<slug:service_slug>/overview/', views.service_overview, name='service_overview'),
-    path('service/<slug:service_slug>/budget/update/', views.update_budget, name='update_budget'),
-    path('service/<slug:service_slug>/transactions/<int:tx_id>/delete/', views.delete_transaction, name='delete_transaction'),
-    path('service/<slug:service_slug>/unlock/', views.unlock_service, name='unlock_service'),
-    path('service/toggle/', views.toggle_service, name='toggle_service'),
-    path('service/<slug:service_slug>/toggle/', views.toggle_service, name='toggle_service_slug'),
     # Internal APIs for Budget Tracker (called by n8n)
-    path('api/budget/remaining/', views.api_budget_remaining, name='api_budget_remaining'),
-    path('api/budget/transactions/add/', views.api_add_transaction, name='api_add_transaction'),
     path('api/phone/allowed/', views.api_phone_allowed, name='api_phone_allowed'),
     path('api/phone/username/', views.api_get_username, name='api_get_username'),
     path('api/phone/active-service/', views.api_get_active_service, name='api_get_active_service'),
-    path('api/user/reset-password/', views.api_reset_password, name='api_reset_password'),
-    path('account/delete/', views.delete_account, name='delete_account'),
-    # Google OAuth
-    path('google/oauth/start/', views.google_oauth_start, name='google_oauth_start'),
-    path('google/oauth/callback/', views.google_oauth_callback, name='google_oauth_callback'),
-    path('google/signout/', views.google_signout, name='google_signout'),
+    path('api/budget/remaining/', views.api_budget_remaining, name='api_budget_remaining'),
+    path('api/budget/transactions/add/', views.api_add_transaction, name='api_add_transaction'),
     # Google API endpoints for n8n
     path('api/google/gmail/send', views.api_google_gmail_send, name='api_google_gmail_send'),
     path('api/google/gmail/reply', views.api_google_gmail_reply, name='api_google_gmail_reply'),
@@ -42,4 +26,25 @@ urlpatterns = [
     path('api/google/gmail/watch', views.api_google_gmail_watch, name='api_google_gmail_watch'),
     path('api/google/calendar/watch', views.api_google_calendar_watch, name='api_google_calendar_watch'),
     path('webhooks/google/calendar', views.google_calendar_webhook, name='google_calendar_webhook'),
+    # Main pages
+    path('', views.landing_page, name='landing_page'),
+    path('dashboard/', views.dashboard, name='dashboard'),
+    path('service/<slug:service_slug>/', views.service_detail, name='service_detail'),
+    path('service/<slug:service_slug>/overview/', views.service_overview, name='service_overview'),
+    path('service/<slug:service_slug>/overview/export.csv', views.export_transactions, name='export_transactions'),
+    path('service/<slug:service_slug>/budget/update/', views.update_budget, name='update_budget'),
+    path('service/<slug:service_slug>/transactions/<int:tx_id>/delete/', views.delete_transaction, name='delete_transaction'),
+    path('service/<slug:service_slug>/unlock/', views.unlock_service, name='unlock_service'),
+    path('service/toggle/', views.toggle_service, name='toggle_service'),
+    path('service/<slug:service_slug>/toggle/', views.toggle_service, name='toggle_service_slug'),
+    path('privacy/', views.privacy_policy, name='privacy_policy'),
+    path('signup/', views.signup_view, name='signup'),
+    path('login/', views.login_view, name='login'),
+    path('logout/', views.logout_view, name='logout'),
+    path('api/user/reset-password/', views.api_reset_password, name='api_reset_password'),
+    path('account/delete/', views.delete_account, name='delete_account'),
+    # Google OAuth
+    path('google/oauth/start/', views.google_oauth_start, name='google_oauth_start'),
+    path('google/oauth/callback/', views.google_oauth_callback, name='google_oauth_callback'),
+    path('google/signout/', views.google_signout, name='google_signout'),
 ]
@@ -1,29 +1,179 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.forms import UserCreationForm
-from django.contrib.auth import login
+from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
+from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction as db_transaction
+from django.db.models import Q, Sum
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django import forms
-import json
-import os
-
+from functools import wraps
+import csv
+import hmac
+import itertools
+import logging
+import orjson
+import re
+
+from .cache_keys import ACTIVE_SERVICES_CACHE_KEY, LANDING_CACHE_KEY, budget_cache_key, username_cache_key
 from .models import Service, UserWorkflow, BudgetService, Transaction, UserProfile, GoogleCredential
 from .google_api import get_gmail_service, get_calendar_service
 from google_auth_oauthlib.flow import Flow
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import base64
 import uuid
-from datetime import datetime
+from datetime import date as dt_date, datetime
+from decimal import Decimal, InvalidOperation
 from django.utils import timezone
 from django.urls import reverse
+from django.template.loader import render_to_string
 from .provisioning import unlock_service_for_user, toggle_user_service, get_active_service
-from requests import HTTPError
+
+
+logger = logging.getLogger(__name__)
+
+BUDGET_CACHE_TIMEOUT = 300
+TRANSACTIONS_PAGE_SIZE = 50
+LANDING_CACHE_TIMEOUT = 300
+ACTIVE_SERVICES_CACHE_TIMEOUT = 300
+USERNAME_CACHE_TIMEOUT = 45
+# Raw phone input is capped before normalization to bound the work, and the
+# normalized number must fit the phone_number columns
+MAX_RAW_PHONE_LENGTH = 64
+MAX_PHONE_LENGTH = UserProfile._meta.get_field('phone_number').max_length
+# Largest batch api_add_transaction will ingest in one request
+MAX_TRANSACTIONS_PER_REQUEST = 500
+# Longest password accepted for a reset; bounds the hashing work per request
+MAX_PASSWORD_LENGTH = 1024
+# Password resets allowed per minute, per client IP and per target username
+RESET_PASSWORD_IP_LIMIT = 5
+RESET_PASSWORD_USER_LIMIT = 3
+RESET_PASSWORD_WINDOW = 60
+
+# Deletion table for every Latin-1 character except digits and '+'
+_PHONE_TRANS = str.maketrans('', '', ''.join(chr(i) for i in range(256) if chr(i) not in '0123456789+'))
+_PHONE_RE = re.compile(r'[^0-9+]')
+# At least 8 characters with a lower case letter, an upper case letter and a digit
+_PASSWORD_RE = re.compile(r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d).{8,}', re.DOTALL)
+
+
+def _normalize_phone(phone):
+    """Strip a phone number down to its digits, dropping any leading '+'."""
+    normalized = phone.translate(_PHONE_TRANS)
+    if not normalized.isascii():
+        # Characters outside the table are rare; let the regex engine drop them
+        normalized = _PHONE_RE.sub('', normalized)
+    return normalized.lstrip('+')
+
+
+def _clean_phone(phone):
+    """Normalize raw phone input; None if it is too long for the phone columns."""
+    if len(phone) > MAX_RAW_PHONE_LENGTH:
+        return None
+    normalized = _normalize_phone(phone)
+    return normalized if len(normalized) <= MAX_PHONE_LENGTH else None
+
+
+_fromisoformat = dt_date.fromisoformat
+
+
+def _parse_amount(value):
+    """Parse a money amount from form or JSON input; None unless it is a finite number."""
+    if isinstance(value, bool):
+        return None
+    try:
+        # ints and strings convert exactly; floats go through their shortest repr
+        amount = Decimal(value) if isinstance(value, (int, str)) else Decimal(repr(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return amount if amount.is_finite() else None
+
+
+def _rate_limited(key, limit, window):
+    """Count a hit against ``key``; True once more than ``limit`` land in one window."""
+    # add() only seeds the counter when the window is not already open
+    cache.add(key, 0, window)
+    try:
+        hits = cache.incr(key)
+    except ValueError:
+        # The window expired between add() and incr()
+        cache.set(key, 1, window)
+        hits = 1
+    return hits > limit
+
+
+def _client_ip(request):
+    """The client's address, read past TRUSTED_PROXY_COUNT proxies in X-Forwarded-For."""
+    count = settings.TRUSTED_PROXY_COUNT
+    if count:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(hops) >= count:
+            return hops[-count]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _parse_transaction_cursor(value):
+    """Parse a ``<date>,<created_at>`` keyset cursor; None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        date_part, created_part = value.split(',', 1)
+        return datetime.fromisoformat(date_part).date(), datetime.fromisoformat(created_part)
+    except ValueError:
+        return None
+
+
+def _wants_json(request):
+    """True for fetch/XHR callers that asked for JSON instead of a redirect."""
+    return (
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('Accept', '')
+    )
+
+
+def _post_result(request, level, message, url):
+    """Finish a form POST: flash message and redirect, or JSON for AJAX callers."""
+    if _wants_json(request):
+        if level == messages.ERROR:
+            return JsonResponse({'success': False, 'error': message}, status=400)
+        return JsonResponse({'success': True, 'message': message, 'redirect': url})
+    messages.add_message(request, level, message)
+    return redirect(url)
+
+
+def _active_services():
+    """All active services, cached; the catalogue only changes through the admin."""
+    return cache.get_or_set(
+        ACTIVE_SERVICES_CACHE_KEY,
+        lambda: list(Service.objects.filter(is_active=True)),
+        ACTIVE_SERVICES_CACHE_TIMEOUT,
+    )
+
+
+def _request_phone(request):
+    """The signed-in user's profile phone number, or None.
+
+    The profile is loaded on first access and cached on request.user, so
+    only views that need the phone pay for the query.
+    """
+    profile = getattr(request.user, 'profile', None)
+    return profile.phone_number if profile else None
+
+
+def _get_active_service_or_404(slug):
+    """Cached stand-in for get_object_or_404(Service, slug=slug, is_active=True)."""
+    for service in _active_services():
+        if service.slug == slug:
+            return service
+    raise Http404('No active service matches the given query.')
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -38,31 +188,21 @@ class CustomUserCreationForm(UserCreationForm):
         model = UserCreationForm.Meta.model
         fields = UserCreationForm.Meta.fields + ('phone_number',)
 
-    def clean_phone_number(self):
-        """Validate that the phone number is unique."""
-        phone = self.cleaned_data.get('phone_number')
-        if phone:
-            # Normalize the phone number for comparison
-            normalized = ''.join(c for c in phone if c.isdigit() or c == '+')
-            if normalized.startswith('+'):
-                normalized = normalized[1:]
-
-            # Check if this normalized phone number already exists
-            if UserProfile.objects.filter(phone_number=normalized).exists():
-                raise forms.ValidationError("This phone number is already in use by another account. Please use a different phone number.")
-
-        return phone
-
     def save(self, commit=True):
-        user = super().save(commit=commit)
-        # Persist phone number in user.profile
+        """Create the user and profile; the unique index on phone_number rejects duplicates.
+
+        Raises ValidationError (and rolls the user back) if the phone is taken.
+        """
         phone = self.cleaned_data.get('phone_number')
-        if phone is not None:
-            normalized = ''.join(c for c in phone if c.isdigit() or c == '+')
-            if normalized.startswith('+'):
-                normalized = normalized[1:]
-            user.profile.phone_number = normalized
-            user.profile.save(update_fields=['phone_number'])
+        try:
+            with db_transaction.atomic():
+                user = super().save(commit=commit)
+                # Persist phone number in user.profile; blank stays NULL so it never collides
+                if commit and phone:
+                    user.profile.phone_number = _normalize_phone(phone) or None
+                    user.profile.save(update_fields=['phone_number'])
+        except IntegrityError:
+            raise forms.ValidationError({'phone_number': "This phone number is already in use by another account. Please use a different phone number."})
         return user
 
 
@@ -71,8 +211,13 @@ def landing_page(request):
     if request.user.is_authenticated:
         return redirect('core:dashboard')
 
-    services = Service.objects.filter(is_active=True)
-    return render(request, 'core/landing_page.html', {'services': services})
+    # Anonymous visitors all get the same page, so render it once per timeout
+    html = cache.get(LANDING_CACHE_KEY)
+    if html is None:
+        services = _active_services()
+        html = render_to_string('core/landing_page.html', {'services': services}, request=request)
+        cache.set(LANDING_CACHE_KEY, html, LANDING_CACHE_TIMEOUT)
+    return HttpResponse(html)
 
 
 def privacy_policy(request):
@@ -87,8 +232,13 @@ def signup_view(request):
 
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
+        user = None
         if form.is_valid():
-            user = form.save()
+            try:
+                user = form.save()
+            except forms.ValidationError as e:
+                form.add_error(None, e)
+        if user:
             login(request, user)
             messages.success(request, 'Account created successfully! Welcome to Flopro WA.')
             return redirect('core:dashboard')
@@ -105,9 +255,6 @@ def login_view(request):
     if request.user.is_authenticated:
         return redirect('core:dashboard')
 
-    from django.contrib.auth import authenticate, login as auth_login
-    from django.contrib.auth.forms import AuthenticationForm
-
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
@@ -115,7 +262,7 @@ def login_view(request):
             password = form.cleaned_data.get('password')
             user = authenticate(username=username, password=password)
             if user is not None:
-                auth_login(request, user)
+                login(request, user)
                 messages.success(request, f'Welcome back, {user.username}!')
                 return redirect('core:dashboard')
             else:
@@ -130,9 +277,6 @@ def login_view(request):
 
 def logout_view(request):
     """Custom logout view to ensure proper redirect."""
-    from django.contrib.auth import logout
-    from django.shortcuts import redirect
-
     logout(request)
     return redirect('core:landing_page')
 
@@ -140,12 +284,14 @@ def logout_view(request):
 @login_required
 def dashboard(request):
     """User dashboard showing available services and active workflows."""
-    services = Service.objects.filter(is_active=True)
-    user_workflows = UserWorkflow.objects.filter(user=request.user).select_related('service')
-    active_service = get_active_service(request.user)
+    services = _active_services()
+    user_workflows = UserWorkflow.objects.for_user(request.user)
+
+    # Derive the active service from the already-joined workflows rather than re-querying
+    active_service = next((uw.service for uw in user_workflows if uw.active), None)
 
     # Create a set of unlocked service IDs for easier template logic
-    unlocked_service_ids = set(uw.service.id for uw in user_workflows)
+    unlocked_service_ids = {uw.service_id for uw in user_workflows}
 
     # Check if user has Google credentials
     has_google_credentials = GoogleCredential.objects.filter(user=request.user).exists()
@@ -168,76 +314,73 @@ def dashboard(request):
 @login_required
 def service_detail(request, service_slug):
     """Show service details and unlock form."""
-    service = get_object_or_404(Service, slug=service_slug, is_active=True)
+    service = _get_active_service_or_404(service_slug)
 
     # Check if user already has this service
-    try:
-        user_workflow = UserWorkflow.objects.get(user=request.user, service=service)
-
+    if service.id in request.unlocked_service_ids:
         # Special case for Ultimate Personal Assistant: allow access to service detail
         # even if unlocked, in case they need to re-authenticate with Google
         if service.slug == 'ultimate-personal-assistant':
-            from .models import GoogleCredential
             # If they don't have Google credentials, let them go through OAuth again
-            if not GoogleCredential.objects.filter(user=request.user).exists():
-                pass  # Continue to service detail page
-            else:
+            if GoogleCredential.objects.filter(user=request.user).exists():
                 return redirect('core:dashboard')  # Already has this service and credentials
         else:
             return redirect('core:dashboard')  # Already has this service
 
-    except UserWorkflow.DoesNotExist:
-        pass
-
     if request.method == 'POST':
         # Handle credential form submission
+        detail_url = reverse('core:service_detail', args=[service.slug])
         try:
+            normalized_phone = None
+            budget_amount = None
+
             # Handle phone number for services that need it
             if service.slug in ['budget-tracker', 'ultimate-personal-assistant']:
-                phone = request.POST.get('phone_number') or (
-                    hasattr(request.user, 'profile') and request.user.profile.phone_number
-                )
+                phone = request.POST.get('phone_number') or _request_phone(request)
 
                 if not phone:
-                    messages.error(request, 'Phone number is required.')
-                    return redirect('core:service_detail', service_slug=service.slug)
-
-                # Normalize and save phone on user if changed or missing
-                normalized_phone = ''.join(c for c in phone if c.isdigit() or c == '+')
-                if normalized_phone.startswith('+'):
-                    normalized_phone = normalized_phone[1:]
-
-                # Ensure user has a profile
-                if not hasattr(request.user, 'profile'):
-                    UserProfile.objects.create(user=request.user, phone_number=normalized_phone)
-                elif request.user.profile.phone_number != normalized_phone:
-                    existing_profile = UserProfile.objects.filter(phone_number=normalized_phone).exclude(user=request.user).first()
-                    if existing_profile:
-                        messages.error(request, 'This phone number is already in use by another account. Please use a different phone number.')
-                        return redirect('core:service_detail', service_slug=service.slug)
-                    request.user.profile.phone_number = normalized_phone
-                    request.user.profile.save(update_fields=['phone_number'])
+                    return _post_result(request, messages.ERROR, 'Phone number is required.', detail_url)
+
+                normalized_phone = _clean_phone(phone)
+                if normalized_phone is None:
+                    return _post_result(request, messages.ERROR, f'Phone number must be at most {MAX_PHONE_LENGTH} digits.', detail_url)
 
                 # Handle budget tracker specific setup
                 if service.slug == 'budget-tracker':
                     budget_raw = request.POST.get('budget_amount')
                     if not budget_raw:
-                        messages.error(request, 'Budget amount is required.')
-                        return redirect('core:service_detail', service_slug=service.slug)
-
-                    # Upsert BudgetService
-                    from decimal import Decimal
-                    try:
-                        budget_amount = Decimal(budget_raw)
-                    except Exception:
-                        messages.error(request, 'Invalid budget amount.')
-                        return redirect('core:service_detail', service_slug=service.slug)
-
-                    BudgetService.objects.update_or_create(
-                        user=request.user,
-                        phone_number=normalized_phone,
-                        defaults={'budget_amount': budget_amount}
-                    )
+                        return _post_result(request, messages.ERROR, 'Budget amount is required.', detail_url)
+
+                    budget_amount = _parse_amount(budget_raw)
+                    if budget_amount is None:
+                        return _post_result(request, messages.ERROR, 'Invalid budget amount.', detail_url)
+
+            # Input is validated; apply all writes in a single transaction
+            unlocked = None
+            try:
+                with db_transaction.atomic():
+                    # Save phone on the (request-cached) profile if changed or missing;
+                    # the unique index rejects numbers owned by another account
+                    if normalized_phone:
+                        profile = getattr(request.user, 'profile', None)
+                        if profile is None:
+                            UserProfile.objects.create(user=request.user, phone_number=normalized_phone)
+                        elif profile.phone_number != normalized_phone:
+                            profile.phone_number = normalized_phone
+                            profile.save(update_fields=['phone_number'])
+
+                    if budget_amount is not None:
+                        BudgetService.upsert(
+                            user=request.user,
+                            phone_number=normalized_phone,
+                            budget_amount=budget_amount,
+                        )
+
+                    # Ultimate Personal Assistant is unlocked after the OAuth callback
+                    if service.slug != 'ultimate-personal-assistant':
+                        unlocked = unlock_service_for_user(user=request.user, service=service)
+            except IntegrityError:
+                return _post_result(request, messages.ERROR, 'This phone number is already in use by another account. Please use a different phone number.', detail_url)
 
             # Handle service-specific unlocking
             if service.slug == 'ultimate-personal-assistant':
@@ -249,24 +392,22 @@ def service_detail(request, service_slug):
 
                 # Redirect to Google OAuth flow - this is the ONLY path for Ultimate Personal Assistant
                 try:
+                    if _wants_json(request):
+                        return JsonResponse({'success': True, 'redirect': reverse('core:google_oauth_start')})
                     return redirect('core:google_oauth_start')
                 except Exception as oauth_error:
                     print(f"OAuth redirect error: {oauth_error}")  # Debug logging
-                    messages.error(request, f"OAuth setup failed: {str(oauth_error)}")
-                    return redirect('core:service_detail', service_slug=service.slug)
-
-            # For other services (like Budget Tracker), use regular unlocking
-            if unlock_service_for_user(user=request.user, service=service):
-                messages.success(request, f"Successfully unlocked {service.name}!")
-            else:
-                messages.warning(request, f"You already have {service.name} unlocked.")
+                    return _post_result(request, messages.ERROR, f"OAuth setup failed: {str(oauth_error)}", detail_url)
 
-            return redirect('core:dashboard')
+            # For other services (like Budget Tracker), regular unlocking happened above
+            dashboard_url = reverse('core:dashboard')
+            if unlocked:
+                return _post_result(request, messages.SUCCESS, f"Successfully unlocked {service.name}!", dashboard_url)
+            return _post_result(request, messages.WARNING, f"You already have {service.name} unlocked.", dashboard_url)
 
         except Exception as e:
             print(f"Service unlock error: {e}")  # Debug logging
-            messages.error(request, f"Failed to unlock service: {str(e)}")
-            return redirect('core:service_detail', service_slug=service.slug)
+            return _post_result(request, messages.ERROR, f"Failed to unlock service: {str(e)}", detail_url)
 
     # Service-specific handling
     credential_schema = {}
@@ -274,11 +415,8 @@ def service_detail(request, service_slug):
 
     user_has_phone = False
     if needs_phone:
-        user_has_phone = (
-            hasattr(request.user, 'profile') and
-            request.user.profile.phone_number and
-            request.user.profile.phone_number.strip()
-        )
+        user_phone = _request_phone(request)
+        user_has_phone = bool(user_phone and user_phone.strip())
 
         # For services that need phone, we handle it in the template
         # No need to modify credential_schema since it's empty
@@ -295,36 +433,51 @@ def service_detail(request, service_slug):
 @login_required
 def service_overview(request, service_slug):
     """Overview page for a service; for budget-tracker show metrics and table."""
-    service = get_object_or_404(Service, slug=service_slug, is_active=True)
+    service = _get_active_service_or_404(service_slug)
     if service.slug != 'budget-tracker':
         return redirect('core:service_detail', service_slug=service.slug)
 
     # Ensure user has unlocked
-    if not UserWorkflow.objects.filter(user=request.user, service=service).exists():
+    if service.id not in request.unlocked_service_ids:
         messages.error(request, 'Please unlock this service first.')
         return redirect('core:service_detail', service_slug=service.slug)
 
     # Resolve phone
-    phone = None
-    if getattr(request.user, 'profile', None):
-        phone = request.user.profile.phone_number
-    # Fallback: scan BudgetService rows
-    if not phone:
-        profile = BudgetService.objects.filter(user=request.user).order_by('-updated_at').first()
-        phone = profile.phone_number if profile else None
-
+    phone = _request_phone(request)
     if not phone:
         messages.error(request, 'Missing phone number. Please reconfigure this service.')
         return redirect('core:service_detail', service_slug=service.slug)
 
-    # Load budget profile
-    profile = BudgetService.objects.filter(user=request.user, phone_number=phone).order_by('-updated_at').first()
-    from django.db.models import Sum
-    spent = Transaction.objects.filter(phone_number=phone).aggregate(s=Sum('total'))['s'] or 0
+    # Load budget profile; spend is kept up to date on the row itself
+    profile = (
+        BudgetService.objects.filter(user=request.user, phone_number=phone)
+        .only('budget_amount', 'spent')
+        .order_by('-updated_at')
+        .first()
+    )
+    if profile:
+        spent = profile.spent
+    else:
+        spent = Transaction.objects.filter(phone_number=phone).aggregate(s=Sum('total'))['s'] or 0
     remaining = (profile.budget_amount if profile else 0) - spent
 
-    # Transactions list
-    transactions = Transaction.objects.filter(phone_number=phone).order_by('-date', '-created_at')
+    # Transactions list, one keyset page at a time (newest first)
+    transactions = Transaction.objects.filter(phone_number=phone)
+    cursor = _parse_transaction_cursor(request.GET.get('after'))
+    if cursor:
+        after_date, after_created = cursor
+        transactions = transactions.filter(
+            Q(date__lt=after_date) | Q(date=after_date, created_at__lt=after_created)
+        )
+    transactions = list(
+        transactions.only('id', 'name', 'date', 'total', 'created_at')
+        .order_by('-date', '-created_at')[:TRANSACTIONS_PAGE_SIZE + 1]
+    )
+    next_cursor = None
+    if len(transactions) > TRANSACTIONS_PAGE_SIZE:
+        transactions = transactions[:TRANSACTIONS_PAGE_SIZE]
+        last = transactions[-1]
+        next_cursor = f"{last.date.isoformat()},{last.created_at.isoformat()}"
 
     context = {
         'service': service,
@@ -333,6 +486,8 @@ def service_overview(request, service_slug):
         'spent': spent,
         'remaining': remaining,
         'transactions': transactions,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
     }
     return render(request, 'core/budget_overview.html', context)
 
@@ -340,60 +495,45 @@ def service_overview(request, service_slug):
 @login_required
 @require_POST
 def update_budget(request, service_slug):
-    service = get_object_or_404(Service, slug=service_slug, is_active=True)
+    service = _get_active_service_or_404(service_slug)
     if service.slug != 'budget-tracker':
         return redirect('core:service_detail', service_slug=service.slug)
 
+    overview_url = reverse('core:service_overview', args=[service.slug])
     amount = request.POST.get('budget_amount')
     if not amount:
-        messages.error(request, 'Budget amount is required.')
-        return redirect('core:service_overview', service_slug=service.slug)
-
-    # Resolve phone
-    phone = None
-    if getattr(request.user, 'profile', None):
-        phone = request.user.profile.phone_number
-    profile = BudgetService.objects.filter(user=request.user).order_by('-updated_at').first()
-    if not phone and profile:
-        phone = profile.phone_number
+        return _post_result(request, messages.ERROR, 'Budget amount is required.', overview_url)
 
+    # Resolve phone (budgets are always written after the profile phone)
+    phone = _request_phone(request)
     if not phone:
-        messages.error(request, 'Missing phone number. Please reconfigure this service.')
-        return redirect('core:service_overview', service_slug=service.slug)
+        return _post_result(request, messages.ERROR, 'Missing phone number. Please reconfigure this service.', overview_url)
 
-    from decimal import Decimal
-    try:
-        val = Decimal(str(amount))
-    except Exception:
-        messages.error(request, 'Invalid budget amount.')
-        return redirect('core:service_overview', service_slug=service.slug)
+    val = _parse_amount(amount)
+    if val is None:
+        return _post_result(request, messages.ERROR, 'Invalid budget amount.', overview_url)
 
-    BudgetService.objects.update_or_create(
-        user=request.user,
-        phone_number=phone,
-        defaults={'budget_amount': val}
-    )
+    BudgetService.upsert(user=request.user, phone_number=phone, budget_amount=val)
+    if _wants_json(request):
+        spent = BudgetService.objects.filter(user=request.user, phone_number=phone).values_list('spent', flat=True).first() or 0
+        return JsonResponse({'success': True, 'budget': str(val), 'remaining': str(val - spent)})
     messages.success(request, 'Budget updated successfully.')
-    return redirect('core:service_overview', service_slug=service.slug)
+    return redirect(overview_url)
 
 
 @login_required
 @require_POST
 def delete_transaction(request, service_slug, tx_id):
-    service = get_object_or_404(Service, slug=service_slug, is_active=True)
+    service = _get_active_service_or_404(service_slug)
     if service.slug != 'budget-tracker':
         return redirect('core:service_detail', service_slug=service.slug)
 
     # Resolve phone allowed to delete
-    phone = None
-    if getattr(request.user, 'profile', None):
-        phone = request.user.profile.phone_number
-    profile = BudgetService.objects.filter(user=request.user).order_by('-updated_at').first()
-    if not phone and profile:
-        phone = profile.phone_number
+    phone = _request_phone(request)
 
     tx = get_object_or_404(Transaction, id=tx_id)
     if phone and tx.phone_number == phone:
+        # Transaction.delete() takes the amount back off BudgetService.spent
         tx.delete()
         messages.success(request, 'Transaction deleted.')
     else:
@@ -401,18 +541,58 @@ def delete_transaction(request, service_slug, tx_id):
     return redirect('core:service_overview', service_slug=service.slug)
 
 
+# Leading characters that make spreadsheets evaluate a cell as a formula
+_CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_safe(value):
+    """Quote user text so spreadsheets show it instead of evaluating it."""
+    return f"'{value}" if value.startswith(_CSV_FORMULA_PREFIXES) else value
+
+
+class _Echo:
+    """File-like object whose write() hands the row back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+@login_required
+def export_transactions(request, service_slug):
+    """Stream the user's full transaction history as CSV."""
+    service = _get_active_service_or_404(service_slug)
+    if service.slug != 'budget-tracker' or service.id not in request.unlocked_service_ids:
+        return redirect('core:service_detail', service_slug=service.slug)
+
+    phone = _request_phone(request)
+    if not phone:
+        messages.error(request, 'Missing phone number. Please reconfigure this service.')
+        return redirect('core:service_overview', service_slug=service.slug)
+
+    # Iterate in chunks so memory stays flat however long the history is
+    rows = (
+        Transaction.objects.filter(phone_number=phone)
+        .order_by('-date', '-created_at')
+        .values_list('date', 'name', 'total')
+        .iterator(chunk_size=1000)
+    )
+    writer = csv.writer(_Echo())
+    lines = itertools.chain([writer.writerow(['date', 'name', 'total'])], (writer.writerow((date, _csv_safe(name), total)) for date, name, total in rows))
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
+    return response
+
+
 @login_required
 @require_POST
 def toggle_service(request, service_slug=None):
     """Toggle between user services."""
     # Handle AJAX requests with service_slug in POST data
     if request.content_type == 'application/json':
-        try:
-            import json
-            data = json.loads(request.body)
-            service_slug = data.get('service_slug')
-        except:
+        data = _json_body(request)
+        if data is None:
             return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+        service_slug = data.get('service_slug')
 
     if not service_slug:
         if request.content_type == 'application/json':
@@ -420,11 +600,10 @@ def toggle_service(request, service_slug=None):
         messages.error(request, 'Service slug required')
         return redirect('core:dashboard')
 
-    service = get_object_or_404(Service, slug=service_slug, is_active=True)
+    service = _get_active_service_or_404(service_slug)
 
     # Special check for Ultimate Personal Assistant - requires Google credentials
     if service.slug == 'ultimate-personal-assistant':
-        from .models import GoogleCredential
         if not GoogleCredential.objects.filter(user=request.user).exists():
             if request.content_type == 'application/json':
                 return JsonResponse({'success': False, 'error': 'Google sign-in required for Ultimate Personal Assistant. Please sign in with Google first.'})
@@ -448,48 +627,29 @@ def delete_account(request):
     """Handle account deletion with confirmation."""
     if request.method == 'POST':
         try:
-            # Get user profile safely
-            user_profile = None
-            phone_number = None
-            try:
-                user_profile = request.user.profile
-                phone_number = user_profile.phone_number
-            except:
-                pass  # Profile might not exist
+            phone_number = _request_phone(request)
+            user_to_delete = request.user
 
             # Get user data before deletion for logging
             user_data = {
-                'username': request.user.username,
-                'email': request.user.email,
+                'username': user_to_delete.username,
+                'email': user_to_delete.email,
                 'phone': phone_number,
-                'services_count': UserWorkflow.objects.filter(user=request.user).count(),
-                'transactions_count': Transaction.objects.filter(phone_number=phone_number).count() if phone_number else 0,
-                'has_google_creds': GoogleCredential.objects.filter(user=request.user).exists()
             }
 
-            # Delete all related data in proper order
-            # 1. Delete UserWorkflows (this handles the relationship to services)
-            UserWorkflow.objects.filter(user=request.user).delete()
-
-            # 2. Delete BudgetService entries
-            if phone_number:
-                BudgetService.objects.filter(phone_number=phone_number).delete()
-
-            # 3. Delete transactions associated with this user's phone number
-            if phone_number:
-                Transaction.objects.filter(phone_number=phone_number).delete()
+            with db_transaction.atomic():
+                # Transactions and budgets are keyed by phone number, not by user.
+                # Budgets go first so the transaction delete has no spend left to resync.
+                if phone_number:
+                    BudgetService.objects.filter(phone_number=phone_number).delete()
+                    BudgetService.invalidate_cache([phone_number])
+                    user_data['transactions'], _ = Transaction.objects.filter(phone_number=phone_number).delete()
 
-            # 4. Delete Google credentials (explicitly, though CASCADE should handle this)
-            GoogleCredential.objects.filter(user=request.user).delete()
-
-            # Store user reference before logout
-            user_to_delete = request.user
-
-            # Delete the user (this will cascade to UserProfile and any other related models)
-            user_to_delete.delete()
+                # Delete the user; UserWorkflows, Google credentials and the
+                # UserProfile go with it via CASCADE
+                user_to_delete.delete()
 
             # Now logout (this will set request.user to AnonymousUser)
-            from django.contrib.auth import logout
             logout(request)
 
             # Log the deletion (you might want to log this elsewhere)
@@ -503,16 +663,12 @@ def delete_account(request):
             return redirect('core:dashboard')
 
     # GET request - show confirmation page
-    phone_number = None
-    try:
-        phone_number = request.user.profile.phone_number
-    except:
-        pass  # Profile might not exist
+    phone_number = _request_phone(request)
 
     context = {
-        'user_workflows': UserWorkflow.objects.filter(user=request.user),
-        'budget_services': BudgetService.objects.filter(user=request.user) if phone_number else [],
-        'transactions': Transaction.objects.filter(phone_number=phone_number) if phone_number else [],
+        'user_workflows': UserWorkflow.objects.for_user(request.user),
+        'budget_services': BudgetService.objects.filter(user=request.user).only('id', 'budget_amount') if phone_number else [],
+        'transaction_count': Transaction.objects.filter(phone_number=phone_number).count() if phone_number else 0,
         'has_phone': bool(phone_number),
     }
     return render(request, 'core/delete_account.html', context)
@@ -523,27 +679,15 @@ def delete_account(request):
 def unlock_service(request, service_slug):
     """AJAX endpoint to unlock a service."""
     try:
-        service = get_object_or_404(Service, slug=service_slug, is_active=True)
+        service = _get_active_service_or_404(service_slug)
 
         # Check if user already has this service
-        if UserWorkflow.objects.filter(user=request.user, service=service).exists():
+        if service.id in request.unlocked_service_ids or not unlock_service_for_user(user=request.user, service=service):
             return JsonResponse({'success': False, 'error': 'Service already unlocked'})
 
-        # Extract credential data from POST
-        credential_data = extract_credential_data(request.POST, service)
-
-        # Provision the workflow
-        workflow_id, credential_id = provision_user_workflow(
-            user=request.user,
-            service=service,
-            credential_data=credential_data
-        )
-
         return JsonResponse({
             'success': True,
             'message': f'Successfully unlocked {service.name}!',
-            'workflow_id': workflow_id,
-            'credential_id': credential_id
         })
 
     except Exception as e:
@@ -556,16 +700,13 @@ def unlock_service(request, service_slug):
 # oauth_callback function removed - n8n integration no longer needed
 
 
-def extract_credential_data(post_data, service):
-    """Extract credential data from POST data - simplified since no schema."""
-    credential_data = {}
+CREDENTIAL_FIELDS = ('phone_number', 'budget_amount')
 
-    # Simple extraction without schema validation
-    for field_name in post_data:
-        if field_name in ['phone_number', 'budget_amount']:
-            credential_data[field_name] = post_data[field_name]
 
-    return credential_data
+def extract_credential_data(post_data, service):
+    """Extract credential data from POST data - simplified since no schema."""
+    # Probe the fixed field list instead of scanning every POST key
+    return {field: post_data[field] for field in CREDENTIAL_FIELDS if field in post_data}
 
 
 # API endpoints for n8n webhooks (if needed)
@@ -573,187 +714,233 @@ def extract_credential_data(post_data, service):
 
 
 def _extract_api_key(request):
+    """API key from X-API-Key, then Authorization (Bearer or bare), then ?api_key."""
+    api_key = request.headers.get('X-API-Key')
+    if api_key:
+        return api_key
     auth_header = request.headers.get('Authorization')
-    bearer = None
     if auth_header:
-        parts = auth_header.split(' ', 1)
-        if len(parts) == 2 and parts[0].lower() == 'bearer':
-            bearer = parts[1].strip()
-        else:
-            bearer = auth_header.strip()
-    return request.headers.get('X-API-Key') or bearer or request.GET.get('api_key')
+        scheme, sep, token = auth_header.partition(' ')
+        bearer = token.strip() if sep and scheme.lower() == 'bearer' else auth_header.strip()
+        if bearer:
+            return bearer
+    return request.GET.get('api_key')
+
+
+# Read once at import instead of going through LazySettings on every API call
+_INTERNAL_API_KEY = settings.INTERNAL_API_KEY.encode()
+
+
+@receiver(setting_changed)
+def _reload_internal_api_key(setting, value, **kwargs):
+    global _INTERNAL_API_KEY
+    if setting == 'INTERNAL_API_KEY':
+        _INTERNAL_API_KEY = (value or '').encode()
+
+
+def _api_key_matches(api_key):
+    """Constant-time comparison against settings.INTERNAL_API_KEY."""
+    if not _INTERNAL_API_KEY or not api_key:
+        return False
+    return hmac.compare_digest(api_key.encode(), _INTERNAL_API_KEY)
 
 
 def _require_internal_api_key(request):
-    api_key = _extract_api_key(request)
-    if not settings.INTERNAL_API_KEY or api_key != settings.INTERNAL_API_KEY:
-        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    if not _api_key_matches(_extract_api_key(request)):
+        return _error_response(_ERR_UNAUTHORIZED, 401)
     return None
 
 
-@csrf_exempt
-def api_budget_remaining(request):
-    """Return remaining budget for a phone number: budget - sum(transactions)."""
-    from django.conf import settings
-    if request.method not in ('GET', 'POST'):
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
+def _json_body(request):
+    """Parse the request body as a JSON object once per request; None if it is not one."""
+    if not hasattr(request, '_json_body'):
+        try:
+            body = orjson.loads(request.body or b'{}')
+        except orjson.JSONDecodeError:
+            body = None
+        request._json_body = body if isinstance(body, dict) else None
+    return request._json_body
 
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
 
-    phone = request.GET.get('phone')
-    if request.method == 'POST' and not phone:
-        try:
-            body = json.loads(request.body or '{}')
-        except Exception:
-            body = {}
-        phone = body.get('phone') or body.get('phone_number') or request.POST.get('phone') or request.POST.get('phone_number')
-    if not phone:
-        return JsonResponse({'error': 'phone required'}, status=400)
+def _json_response(data, status=200):
+    """JsonResponse equivalent serialized with orjson for the hot internal API paths."""
+    return HttpResponse(orjson.dumps(data), content_type='application/json', status=status)
 
-    normalized_phone = ''.join(c for c in phone if c.isdigit() or c == '+')
-    if normalized_phone.startswith('+'):
-        normalized_phone = normalized_phone[1:]
 
-    # Find budget profile
-    profile = BudgetService.objects.filter(phone_number=normalized_phone).order_by('-updated_at').first()
-    if not profile:
-        return JsonResponse({'error': 'budget not found'}, status=404)
+# Pre-serialized bodies for the fixed internal API errors. Responses are still
+# built per request since middleware may add headers to them.
+_ERR_UNAUTHORIZED = orjson.dumps({'error': 'Unauthorized'})
+_ERR_METHOD_NOT_ALLOWED = orjson.dumps({'error': 'Method not allowed'})
+_ERR_PHONE_REQUIRED = orjson.dumps({'error': 'phone required'})
+_ERR_PHONE_TOO_LONG = orjson.dumps({'error': 'phone too long'})
+_ERR_INVALID_JSON = orjson.dumps({'error': 'invalid json'})
+_ERR_USER_NOT_FOUND = orjson.dumps({'error': 'user not found'})
+_ERR_TOO_MANY_REQUESTS = orjson.dumps({'error': 'Too many requests'})
 
-    from django.db.models import Sum
-    spent = Transaction.objects.filter(phone_number=normalized_phone).aggregate(s=Sum('total'))['s'] or 0
-    remaining = profile.budget_amount - spent
-    return JsonResponse({
-        'phone': normalized_phone,
-        'budget': str(profile.budget_amount),
-        'spent': str(spent),
-        'remaining': str(remaining),
-        'updated_at': profile.updated_at.isoformat(),
-    })
 
+def _error_response(body, status):
+    """Wrap one of the pre-serialized _ERR_* bodies in a fresh response."""
+    return HttpResponse(body, content_type='application/json', status=status)
 
-@csrf_exempt
-def api_add_transaction(request):
-    """Add a transaction for a phone number via n8n or internal calls."""
-    from django.conf import settings
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
 
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
+def internal_api(methods=('GET', 'POST'), require_phone=False):
+    """Decorate an internal API view with method, API key and phone handling.
 
-    try:
-        payload = json.loads(request.body)
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    With ``require_phone``, the phone is read from ?phone=, the JSON body or
+    form data and stored normalized on ``request.phone``.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _error_response(_ERR_METHOD_NOT_ALLOWED, 405)
+
+            resp = _require_internal_api_key(request)
+            if resp:
+                return resp
+
+            if require_phone:
+                phone = request.GET.get('phone')
+                if request.method == 'POST' and not phone:
+                    body = _json_body(request) or {}
+                    phone = body.get('phone') or body.get('phone_number') or request.POST.get('phone') or request.POST.get('phone_number')
+                if not phone:
+                    return _error_response(_ERR_PHONE_REQUIRED, 400)
+                request.phone = _clean_phone(phone)
+                if request.phone is None:
+                    return _error_response(_ERR_PHONE_TOO_LONG, 400)
 
-    phone = payload.get('phone')
-    name = payload.get('name')
-    date = payload.get('date')
-    total = payload.get('total')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
 
-    if not all([phone, name, date, total]):
-        return JsonResponse({'error': 'phone, name, date, total are required'}, status=400)
 
-    normalized_phone = ''.join(c for c in phone if c.isdigit() or c == '+')
-    if normalized_phone.startswith('+'):
-        normalized_phone = normalized_phone[1:]
+@internal_api(require_phone=True)
+def api_budget_remaining(request):
+    """Return remaining budget for a phone number: budget - sum(transactions)."""
+    normalized_phone = request.phone
+
+    cache_key = budget_cache_key(normalized_phone)
+    data = cache.get(cache_key)
+    if data is None:
+        # Find budget profile
+        profile = BudgetService.objects.filter(phone_number=normalized_phone).order_by('-updated_at').first()
+        if not profile:
+            return JsonResponse({'error': 'budget not found'}, status=404)
+
+        remaining = profile.budget_amount - profile.spent
+        data = {
+            'phone': normalized_phone,
+            'budget': str(profile.budget_amount),
+            'spent': str(profile.spent),
+            'remaining': str(remaining),
+            'updated_at': profile.updated_at.isoformat(),
+        }
+        cache.set(cache_key, data, BUDGET_CACHE_TIMEOUT)
+    return _json_response(data)
+
+
+def _transaction_record(item):
+    """Validate one add-transaction payload; returns (fields, None) or (None, error response)."""
+    phone = item.get('phone')
+    name = item.get('name')
+    date = item.get('date')
+    total = item.get('total')
+
+    if not all([phone, name, date, total]):
+        return None, JsonResponse({'error': 'phone, name, date, total are required'}, status=400)
+    normalized_phone = _clean_phone(phone)
+    if normalized_phone is None:
+        return None, _error_response(_ERR_PHONE_TOO_LONG, 400)
 
-    from decimal import Decimal
-    from datetime import date as dt_date
+    amt = _parse_amount(total)
     try:
-        amt = Decimal(str(total))
-        tx_date = dt_date.fromisoformat(date)
-    except Exception:
-        return JsonResponse({'error': 'invalid date or total'}, status=400)
-
-    Transaction.objects.create(
-        phone_number=normalized_phone,
-        name=name,
-        date=tx_date,
-        total=amt,
-    )
+        tx_date = _fromisoformat(date)
+    except (TypeError, ValueError):
+        tx_date = None
+    if amt is None or tx_date is None:
+        return None, JsonResponse({'error': 'invalid date or total'}, status=400)
 
-    return JsonResponse({'status': 'ok'})
+    return {'phone_number': normalized_phone, 'name': name, 'date': tx_date, 'total': amt}, None
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
+def api_add_transaction(request):
+    """Add a transaction for a phone number via n8n or internal calls.
+
+    Accepts one transaction object, or {'transactions': [...]} to ingest a batch.
+    """
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
+
+    items = payload.get('transactions')
+    if items is None:
+        record, error = _transaction_record(payload)
+        if error:
+            return error
+        # Transaction.save() adds the amount to BudgetService.spent in the same transaction
+        Transaction.objects.create(**record)
+        return _json_response({'status': 'ok'})
+
+    if not isinstance(items, list) or not 0 < len(items) <= MAX_TRANSACTIONS_PER_REQUEST:
+        return JsonResponse({'error': f'transactions must be a list of 1 to {MAX_TRANSACTIONS_PER_REQUEST} items'}, status=400)
+    records = []
+    for item in items:
+        if not isinstance(item, dict):
+            return _error_response(_ERR_INVALID_JSON, 400)
+        record, error = _transaction_record(item)
+        if error:
+            return error
+        records.append(record)
+
+    Transaction.bulk_ingest(records)
+    return _json_response({'status': 'ok', 'created': len(records)})
+
+
+@internal_api(require_phone=True)
 def api_phone_allowed(request):
     """Return {'allowed': true|false} based on whether the phone has any unlocked service.
 
     Accepts GET ?phone=... or POST JSON {'phone': '...'}.
     Requires INTERNAL_API_KEY via Authorization/X-API-Key/ ?api_key.
     """
-    from django.conf import settings
-    if request.method not in ('GET', 'POST'):
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
+    normalized_phone = request.phone
 
-    # Phone extraction
-    phone = request.GET.get('phone')
-    if request.method == 'POST' and not phone:
-        try:
-            body = json.loads(request.body or '{}')
-        except Exception:
-            body = {}
-        phone = body.get('phone') or body.get('phone_number') or request.POST.get('phone') or request.POST.get('phone_number')
-    if not phone:
-        return JsonResponse({'error': 'phone required'}, status=400)
+    # Check if any workflow exists for user with this phone (profile); the
+    # profile's unique phone index resolves the user_id without joining auth_user
+    profile_user = UserProfile.objects.filter(phone_number=normalized_phone).values('user_id')
+    exists = UserWorkflow.objects.filter(user_id__in=profile_user).exists()
+    return _json_response({'allowed': bool(exists)})
 
-    normalized_phone = ''.join(c for c in phone if c.isdigit() or c == '+')
-    if normalized_phone.startswith('+'):
-        normalized_phone = normalized_phone[1:]
 
-    # Check if any workflow exists for user with this phone (profile)
-    exists = UserWorkflow.objects.filter(user__profile__phone_number=normalized_phone).exists()
-    return JsonResponse({'allowed': bool(exists)})
-
-
-@csrf_exempt
+@internal_api(require_phone=True)
 def api_get_username(request):
     """Return {'username': username} for a given phone number.
 
     Accepts GET ?phone=... or POST JSON {'phone': '...'}.
     Requires INTERNAL_API_KEY via Authorization/X-API-Key/ ?api_key.
     """
-    from django.conf import settings
-    if request.method not in ('GET', 'POST'):
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-
-    # Phone extraction
-    phone = request.GET.get('phone')
-    if request.method == 'POST' and not phone:
-        try:
-            body = json.loads(request.body or '{}')
-        except Exception:
-            body = {}
-        phone = body.get('phone') or body.get('phone_number') or request.POST.get('phone') or request.POST.get('phone_number')
-    if not phone:
-        return JsonResponse({'error': 'phone required'}, status=400)
-
-    # Normalize phone number
-    normalized_phone = ''.join(c for c in phone if c.isdigit() or c == '+')
-    if normalized_phone.startswith('+'):
-        normalized_phone = normalized_phone[1:]
-
-    # Look up username by phone number
-    try:
-        profile = UserProfile.objects.select_related('user').get(phone_number=normalized_phone)
-        return JsonResponse({'username': profile.user.username})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({'error': 'No user found with this phone number'}, status=404)
+    normalized_phone = request.phone
+
+    # Look up username by phone number, served from cache on repeat calls
+    cache_key = username_cache_key(normalized_phone)
+    username = cache.get(cache_key)
+    if username is None:
+        # Fetch just the username column rather than hydrating profile + user
+        username = (
+            UserProfile.objects.filter(phone_number=normalized_phone)
+            .values_list('user__username', flat=True)
+            .first()
+        )
+        if username is None:
+            return JsonResponse({'error': 'No user found with this phone number'}, status=404)
+        cache.set(cache_key, username, USERNAME_CACHE_TIMEOUT)
+    return _json_response({'username': username})
 
 
-@csrf_exempt
+@internal_api(require_phone=True)
 def api_get_active_service(request):
     """Return the active service name for a phone number.
 
@@ -761,29 +948,7 @@ def api_get_active_service(request):
     Requires INTERNAL_API_KEY via Authorization/X-API-Key/ ?api_key.
     Returns {'active_service': 'service_name'} or {'active_service': None} if no active service.
     """
-    from django.conf import settings
-    if request.method not in ('GET', 'POST'):
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-
-    # Phone extraction
-    phone = request.GET.get('phone')
-    if request.method == 'POST' and not phone:
-        try:
-            body = json.loads(request.body or '{}')
-        except Exception:
-            body = {}
-        phone = body.get('phone') or body.get('phone_number') or request.POST.get('phone') or request.POST.get('phone_number')
-    if not phone:
-        return JsonResponse({'error': 'phone required'}, status=400)
-
-    # Normalize phone number
-    normalized_phone = ''.join(c for c in phone if c.isdigit() or c == '+')
-    if normalized_phone.startswith('+'):
-        normalized_phone = normalized_phone[1:]
+    normalized_phone = request.phone
 
     # Find user by phone number
     try:
@@ -793,9 +958,9 @@ def api_get_active_service(request):
         # Get active service for this user
         active_service = get_active_service(user)
         if active_service:
-            return JsonResponse({'active_service': active_service.name})
+            return _json_response({'active_service': active_service.name})
         else:
-            return JsonResponse({'active_service': None})
+            return _json_response({'active_service': None})
 
     except UserProfile.DoesNotExist:
         return JsonResponse({'error': 'No user found with this phone number'}, status=404)
@@ -803,58 +968,66 @@ def api_get_active_service(request):
         return JsonResponse({'error': f'Error retrieving active service: {str(e)}'}, status=500)
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_reset_password(request):
     """Reset user password by username.
 
     Accepts POST JSON {'username': '...', 'password': '...'}.
     Requires INTERNAL_API_KEY via Authorization/X-API-Key/ ?api_key.
+    Rate limited per client IP and per username, since every call runs the KDF.
     """
-    from django.conf import settings
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    client_ip = _client_ip(request)
+    if _rate_limited(f"resetpw:ip:{client_ip}", RESET_PASSWORD_IP_LIMIT, RESET_PASSWORD_WINDOW):
+        return _error_response(_ERR_TOO_MANY_REQUESTS, 429)
+
+    # Extract data from POST; other content types never reach the form parsers
+    content_type = request.content_type or ''
+    if content_type == 'application/json':
+        body = _json_body(request)
+        if body is None:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        username = body.get('username')
+        password = body.get('password')
+    elif content_type.startswith(('application/x-www-form-urlencoded', 'multipart/')):
+        username = request.POST.get('username')
+        password = request.POST.get('password')
+    else:
+        return JsonResponse({'error': 'Unsupported Content-Type'}, status=415)
 
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
+    if not username or not password:
+        return JsonResponse({'error': 'username and password required'}, status=400)
 
-    # Extract data from POST
-    try:
-        if request.content_type == 'application/json':
-            body = json.loads(request.body or '{}')
-            username = body.get('username')
-            password = body.get('password')
-        else:
-            username = request.POST.get('username')
-            password = request.POST.get('password')
-    except Exception:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if len(password) > MAX_PASSWORD_LENGTH:
+        return JsonResponse({'error': 'Password too long'}, status=400)
 
-    if not username:
-        return JsonResponse({'error': 'username required'}, status=400)
+    # Validate password strength in one regex pass
+    if not _PASSWORD_RE.fullmatch(password):
+        return JsonResponse({'error': 'Password must be at least 8 characters long and mix upper case, lower case and digits'}, status=400)
 
-    if not password:
-        return JsonResponse({'error': 'password required'}, status=400)
+    if _rate_limited(f"resetpw:user:{username.lower()}", RESET_PASSWORD_USER_LIMIT, RESET_PASSWORD_WINDOW):
+        return _error_response(_ERR_TOO_MANY_REQUESTS, 429)
 
-    # Validate password strength (basic check)
-    if len(password) < 8:
-        return JsonResponse({'error': 'Password must be at least 8 characters long'}, status=400)
+    # Look up user by username, ignoring case (backed by an UPPER(username) index).
+    # Usernames are case-sensitive, so an exact match wins and a case-only match
+    # is used only when it is unambiguous.
+    matches = dict(User.objects.filter(username__iexact=username).values_list('username', 'id'))
+    user_id = matches.get(username)
+    if user_id is None and len(matches) == 1:
+        user_id, = matches.values()
+    if user_id is None:
+        return JsonResponse({'error': 'User not found'}, status=404)
 
-    # Look up user by username
+    # A bare UPDATE of the hash; the User post_save handlers only resave the profile.
+    # Anything other than a database failure propagates to Django's 500 handler.
     try:
-        from django.contrib.auth.models import User
-        user = User.objects.get(username=username)
-
-        # Set new password (Django automatically hashes it)
-        user.set_password(password)
-        user.save()
-
-        return JsonResponse({'success': True, 'message': f'Password reset successfully for user {username}'})
-
-    except User.DoesNotExist:
+        updated = User.objects.filter(pk=user_id).update(password=make_password(password))
+    except DatabaseError:
+        logger.exception('Password reset failed for user %s', user_id)
+        return JsonResponse({'error': 'Password reset failed'}, status=500)
+    if not updated:
         return JsonResponse({'error': 'User not found'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': f'Password reset failed: {str(e)}'}, status=500)
+
+    return _json_response({'success': True, 'message': f'Password reset successfully for user {username}'})
 
 
 # ---- Google OAuth and API endpoints ----
@@ -959,17 +1132,11 @@ def google_oauth_callback(request):
     return redirect('core:dashboard')
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_google_gmail_send(request):
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-    try:
-        payload = json.loads(request.body or '{}')
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
     username = payload.get('external_user_id') or payload.get('username')
     to = payload.get('to')
     subject = payload.get('subject')
@@ -980,7 +1147,7 @@ def api_google_gmail_send(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
     service = get_gmail_service(user)
     # Build message honoring optional content_type
     if content_type == 'html':
@@ -994,20 +1161,15 @@ def api_google_gmail_send(request):
     return JsonResponse({'id': sent.get('id')})
 
 
-@csrf_exempt
+@internal_api(methods=('GET',))
 def api_google_gmail_messages(request):
-    if request.method != 'GET':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
     username = request.GET.get('external_user_id') or request.GET.get('username')
     if not username:
         return JsonResponse({'error': 'external_user_id required'}, status=400)
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
     service = get_gmail_service(user)
     q = request.GET.get('q')
     label_ids = request.GET.getlist('labelIds') or None
@@ -1015,18 +1177,12 @@ def api_google_gmail_messages(request):
     return JsonResponse(messages)
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_google_gmail_reply(request):
     """Reply to an email message."""
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-    try:
-        payload = json.loads(request.body or '{}')
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
 
     username = payload.get('external_user_id') or payload.get('username')
     message_id = payload.get('message_id') or payload.get('thread_id')
@@ -1040,7 +1196,7 @@ def api_google_gmail_reply(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
 
     service = get_gmail_service(user)
 
@@ -1075,18 +1231,12 @@ def api_google_gmail_reply(request):
         return JsonResponse({'error': f'Failed to send reply: {str(e)}'}, status=500)
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_google_gmail_draft(request):
     """Create a draft email."""
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-    try:
-        payload = json.loads(request.body or '{}')
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
 
     username = payload.get('external_user_id') or payload.get('username')
     to = payload.get('to')
@@ -1100,7 +1250,7 @@ def api_google_gmail_draft(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
 
     service = get_gmail_service(user)
 
@@ -1123,14 +1273,9 @@ def api_google_gmail_draft(request):
         return JsonResponse({'error': f'Failed to create draft: {str(e)}'}, status=500)
 
 
-@csrf_exempt
+@internal_api(methods=('GET',))
 def api_google_gmail_labels(request):
     """Get Gmail labels."""
-    if request.method != 'GET':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
 
     username = request.GET.get('external_user_id') or request.GET.get('username')
     if not username:
@@ -1139,7 +1284,7 @@ def api_google_gmail_labels(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
 
     service = get_gmail_service(user)
 
@@ -1151,18 +1296,12 @@ def api_google_gmail_labels(request):
         return JsonResponse({'error': f'Failed to get labels: {str(e)}'}, status=500)
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_google_gmail_modify_labels(request):
     """Add or remove labels from messages."""
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-    try:
-        payload = json.loads(request.body or '{}')
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
 
     username = payload.get('external_user_id') or payload.get('username')
     message_ids = payload.get('message_ids', [])
@@ -1177,7 +1316,7 @@ def api_google_gmail_modify_labels(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
 
     service = get_gmail_service(user)
 
@@ -1203,14 +1342,9 @@ def api_google_gmail_modify_labels(request):
         return JsonResponse({'error': f'Failed to modify labels: {str(e)}'}, status=500)
 
 
-@csrf_exempt
+@internal_api(methods=('DELETE',))
 def api_google_calendar_events_delete(request):
     """Delete a calendar event."""
-    if request.method != 'DELETE':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
 
     event_id = request.GET.get('event_id')
     username = request.GET.get('external_user_id') or request.GET.get('username')
@@ -1221,32 +1355,27 @@ def api_google_calendar_events_delete(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
 
     service = get_calendar_service(user)
 
     try:
-        result = service.events().delete(calendarId='primary', eventId=event_id).execute()
+        service.events().delete(calendarId='primary', eventId=event_id).execute()
         return JsonResponse({'status': 'deleted', 'event_id': event_id})
 
     except Exception as e:
         return JsonResponse({'error': f'Failed to delete event: {str(e)}'}, status=500)
 
 
-@csrf_exempt
+@internal_api(methods=('GET',))
 def api_google_calendar_events(request):
-    if request.method != 'GET':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
     username = request.GET.get('external_user_id') or request.GET.get('username')
     if not username:
         return JsonResponse({'error': 'external_user_id required'}, status=400)
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
     service = get_calendar_service(user)
     time_min = request.GET.get('timeMin')
     time_max = request.GET.get('timeMax')
@@ -1263,17 +1392,11 @@ def api_google_calendar_events(request):
     return JsonResponse({'items': events.get('items', []), 'nextSyncToken': events.get('nextSyncToken')})
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_google_calendar_events_post(request):
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-    try:
-        payload = json.loads(request.body or '{}')
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
     username = payload.get('external_user_id') or payload.get('username')
     event = payload.get('event')
     if not username or not isinstance(event, dict):
@@ -1281,7 +1404,7 @@ def api_google_calendar_events_post(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
     service = get_calendar_service(user)
     if event.get('id'):
         result = service.events().update(calendarId='primary', eventId=event['id'], body=event).execute()
@@ -1290,17 +1413,11 @@ def api_google_calendar_events_post(request):
     return JsonResponse(result)
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_google_gmail_watch(request):
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-    try:
-        payload = json.loads(request.body or '{}')
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
     username = payload.get('external_user_id') or payload.get('username')
     topic = payload.get('topicName')
     if not username or not topic:
@@ -1308,7 +1425,7 @@ def api_google_gmail_watch(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
     service = get_gmail_service(user)
     watch_body = {'topicName': topic}
     watch_resp = service.users().watch(userId='me', body=watch_body).execute()
@@ -1316,17 +1433,11 @@ def api_google_gmail_watch(request):
     return JsonResponse(watch_resp)
 
 
-@csrf_exempt
+@internal_api(methods=('POST',))
 def api_google_calendar_watch(request):
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-    resp = _require_internal_api_key(request)
-    if resp:
-        return resp
-    try:
-        payload = json.loads(request.body or '{}')
-    except Exception:
-        return JsonResponse({'error': 'invalid json'}, status=400)
+    payload = _json_body(request)
+    if payload is None:
+        return _error_response(_ERR_INVALID_JSON, 400)
     username = payload.get('external_user_id') or payload.get('username')
     address = payload.get('address')
     if not username or not address:
@@ -1334,7 +1445,7 @@ def api_google_calendar_watch(request):
     try:
         user = User.objects.get(username=username)
     except User.DoesNotExist:
-        return JsonResponse({'error': 'user not found'}, status=404)
+        return _error_response(_ERR_USER_NOT_FOUND, 404)
     service = get_calendar_service(user)
     channel_id = str(uuid.uuid4())
     body = {'id': channel_id, 'type': 'web_hook', 'address': address}
@@ -1358,9 +1469,7 @@ def google_calendar_webhook(request):
     channel_id = request.headers.get('X-Goog-Channel-ID')
     if not channel_id:
         return HttpResponse(status=400)
-    try:
-        cred = GoogleCredential.objects.get(calendar_channel_id=channel_id)
-    except GoogleCredential.DoesNotExist:
+    if not GoogleCredential.objects.filter(calendar_channel_id=channel_id).exists():
         return HttpResponse(status=404)
     # In a full implementation you'd trigger sync logic here.
     return JsonResponse({'status': 'received'})
@@ -1374,25 +1483,18 @@ def google_signout(request):
         google_cred = GoogleCredential.objects.get(user=request.user)
         google_cred.delete()
 
-        # Deactivate Ultimate Personal Assistant service if it's active
-        try:
-            from .models import Service
-            upa_service = Service.objects.get(slug='ultimate-personal-assistant')
-            user_workflow = UserWorkflow.objects.get(user=request.user, service=upa_service)
-
-            # Deactivate the service
-            user_workflow.active = False
-            user_workflow.save()
-
+        # Deactivate Ultimate Personal Assistant service if it's active (single UPDATE)
+        deactivated = UserWorkflow.objects.filter(
+            user=request.user, service__slug='ultimate-personal-assistant'
+        ).update(active=False)
+        if deactivated:
             messages.success(request, "Successfully signed out of Google. The Ultimate Personal Assistant service has been deactivated. You'll need to sign in again before the service becomes active.")
-
-        except (Service.DoesNotExist, UserWorkflow.DoesNotExist):
+        else:
             # Service might not exist or not be unlocked
             messages.success(request, "Successfully signed out of Google.")
 
         # Also deactivate any other active services when signing out of Google
         # since UPA might have been the active one
-        from .provisioning import get_active_service
         current_active = get_active_service(request.user)
         if not current_active:
             # If no service is active after UPA deactivation, activate the first available service
@@ -1401,8 +1503,7 @@ def google_signout(request):
                     service__slug='ultimate-personal-assistant'
                 ).first()
                 if first_workflow:
-                    first_workflow.active = True
-                    first_workflow.save()
+                    UserWorkflow.objects.filter(pk=first_workflow.pk).update(active=True)
             except:
                 pass
 
@@ -8,4 +8,6 @@ python manage.py migrate --noinput
 exec gunicorn flopro_wa.wsgi:application \
   --bind 0.0.0.0:8000 \
   --workers 3 \
+  --worker-class gthread \
+  --threads "${GUNICORN_THREADS:-4}" \
   --timeout 90
@@ -42,6 +42,10 @@ CSRF_TRUSTED_ORIGINS = (
 USE_X_FORWARDED_HOST = True
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 # (Keep SECURE_SSL_REDIRECT off unless you confirm cloudflared sets X-Forwarded-Proto=https.)
+# Number of proxies in front of the app that append to X-Forwarded-For; the
+# client IP (used for rate limits) is read that many hops from the end.
+# Set to 0 when the app is reachable directly, or clients could spoof it.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '1'))
 
 # ---- Apps & middleware ----
 INSTALLED_APPS = [
@@ -62,6 +66,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.UnlockedServicesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -104,10 +109,27 @@ if all([DB_NAME, DB_USER, DB_PASSWORD, DB_HOST]):
             "PASSWORD": DB_PASSWORD,
             "HOST": DB_HOST,
             "PORT": DB_PORT,
-            "CONN_MAX_AGE": 60,  # keep-alive for perf
+            # Persistent connections: each gunicorn worker reuses its connection
+            # across requests instead of reconnecting per request
+            "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", "60")),
+            # Drop connections the server (or PgBouncer) closed while idle
+            "CONN_HEALTH_CHECKS": True,
+            # Server-side cursors do not survive PgBouncer transaction pooling
+            "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("POSTGRES_PGBOUNCER", "").lower() in ("1", "true", "yes"),
             "OPTIONS": {"sslmode": os.environ.get("POSTGRES_SSLMODE", "disable")},
         }
     }
+    if os.environ.get("POSTGRES_POOL", "").lower() in ("1", "true", "yes"):
+        # psycopg 3 connection pool per process; Django requires CONN_MAX_AGE=0
+        # with it, as the pool owns connection lifetime
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "1")),
+            # Request threads are the only DB users in a worker (password resets run
+            # inline), so one connection per gunicorn thread never waits on the pool
+            "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", os.environ.get("GUNICORN_THREADS", "4"))),
+            "max_lifetime": 300,
+        }
 else:
     # Fallback (works in dev or before DB is configured)
     SQLITE_PATH = os.environ.get("SQLITE_PATH")
@@ -118,6 +140,35 @@ else:
         }
     }
 
+# ---- Cache ----
+# Budget payloads, phone lookups and the reset rate limits must be shared by
+# all gunicorn workers. Use Redis when REDIS_URL is set; otherwise fall back to
+# a file cache, which every worker on the host sees. The file cache's incr() is
+# not atomic across processes, so the password-reset rate limits can undercount
+# under concurrent requests; they are only exact with Redis. The in-process
+# cache is only used for DEBUG (single runserver process).
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CACHE_DIR", "/tmp/flopro_wa_cache"),
+        }
+    }
+
 
 # ---- i18n ----
 LANGUAGE_CODE = 'en-us'
@@ -141,5 +192,14 @@ LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Argon2id hashes new passwords; existing PBKDF2 hashes still verify and are
+# upgraded on the next successful login
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # ---- Internal API Key (for n8n-to-Django calls) ----
 INTERNAL_API_KEY = os.environ.get('INTERNAL_API_KEY', '')